@@ -1,12 +1,18 @@
 #!/usr/bin/env python3
 import argparse
 import datetime
+import functools
+import gzip
 import json
 import os
 import re
+import shutil
+import string
 import sys
 import tempfile
 import urllib.request
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from typing import Optional
 
 try:
@@ -14,23 +20,87 @@ try:
 except Exception:
     pdfplumber = None
 
-PRICE_RE = re.compile(r"\d+(?:[.,]\d+)?\s*€")
-RANGE_RE = re.compile(r"\d+\s*[–-]\s*\d+\s*€")
+try:
+    import fitz
+except Exception:
+    fitz = None
+
+try:
+    import orjson
+except Exception:
+    orjson = None
+
+PRICE_COMBINED = re.compile(r"(?P<range>\d+\s*[–-]\s*\d+\s*€)|(?P<price>\d+(?:[.,]\d+)?\s*€)")
+SPLIT_LETTERS_RE = re.compile(r"\b([a-z])\s+([a-z])\b")
+# Byte table that turns everything but [a-z0-9 ] into a space.
+ALNUM_TABLE = bytes(
+    c if chr(c) in string.ascii_lowercase + string.digits + " " else ord(" ")
+    for c in range(256)
+)
 
 
 def normalize(text: str) -> str:
-    text = text.lower()
-    text = text.replace("–", "-").replace("—", "-")
-    text = re.sub(r"[^a-z0-9 ]+", " ", text)
-    text = re.sub(r"\s+", " ", text).strip()
+    # Non-ASCII characters (dashes included) become "?" and then a space.
+    text = text.lower().encode("ascii", "replace").translate(ALNUM_TABLE).decode("ascii")
+    text = " ".join(text.split())
     # Repair common PDF extraction artifacts like "a pple" or "i mac"
-    text = re.sub(r"\b([a-z])\s+([a-z])\b", r"\1\2", text)
-    text = re.sub(r"\s+", " ", text).strip()
-    return text
+    return SPLIT_LETTERS_RE.sub(r"\1\2", text)
+
+
+def load_json(path: str):
+    with open(path, "rb") as f:
+        data = f.read()
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dump_json(obj, path: str):
+    # Both encoders produce the same 2-space, UTF-8 output.
+    if orjson is not None:
+        data = orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    else:
+        data = json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def download(url: str, path: str):
+    request = urllib.request.Request(url, headers={"Accept-Encoding": "gzip"})
+    with urllib.request.urlopen(request) as response, open(path, "wb") as f:
+        source = response
+        if response.headers.get("Content-Encoding") == "gzip":
+            source = gzip.GzipFile(fileobj=response)
+        shutil.copyfileobj(source, f, length=1024 * 1024)
+
 
+def extract_page_texts_fitz(pdf_path: str) -> list[str]:
+    with fitz.open(pdf_path) as doc:
+        return [page.get_text() for page in doc]
 
-def extract_tables(pdf_path: str):
+
+def split_page_texts(page_texts: list[str], with_rows: bool = True):
+    text_rows = []
+    blocks = []
+    for text in page_texts:
+        if text.strip():
+            blocks.append(text)
+        if not with_rows:
+            continue
+        for line in text.splitlines():
+            line = line.strip()
+            if line:
+                text_rows.append([line])
+    return text_rows, blocks
+
+
+def extract_text_blocks_fitz(pdf_path: str) -> list[str]:
+    return split_page_texts(extract_page_texts_fitz(pdf_path))[1]
+
+
+def extract_all(pdf_path: str, text_backend: str = "pdfplumber"):
     tables = []
+    page_texts = []
     with pdfplumber.open(pdf_path) as pdf:
         for page in pdf.pages:
             page_tables = page.extract_tables() or []
@@ -41,38 +111,36 @@ def extract_tables(pdf_path: str):
                     cells = [cell.strip() if cell else "" for cell in row]
                     if any(cells):
                         tables.append(cells)
-    return tables
+            if text_backend == "pdfplumber":
+                page_texts.append(page.extract_text() or "")
+            # Drop the parsed layout so memory stays flat on long PDFs.
+            page.flush_cache()
+    if text_backend == "pymupdf":
+        if tables:
+            # PyMuPDF text is a separate pass; leave it until a lookup needs it.
+            return tables, [], None
+        page_texts = extract_page_texts_fitz(pdf_path)
+
+    # Text lines only stand in for table rows when no table was found.
+    text_rows, blocks = split_page_texts(page_texts, with_rows=not tables)
+    return tables, text_rows, blocks
+
+
+def parse_pdf(pdf_path: str, text_backend: str = "pdfplumber"):
+    rows, text_rows, blocks = extract_all(pdf_path, text_backend)
+    if not rows:
+        rows = text_rows
+    return rows, blocks
 
 
-def extract_text_rows(pdf_path: str):
-    rows = []
-    with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
-            text = page.extract_text() or ""
-            for line in text.splitlines():
-                line = line.strip()
-                if line:
-                    rows.append([line])
-    return rows
-
-
-def extract_text_blocks(pdf_path: str) -> list[str]:
-    blocks = []
-    with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
-            text = page.extract_text() or ""
-            if text.strip():
-                blocks.append(text)
-    return blocks
+def lazy_text_blocks(pdf_path: str, blocks):
+    if blocks is not None:
+        return lambda: blocks
+    return functools.partial(extract_text_blocks_fitz, pdf_path)
 
 
 def find_price_tokens(text: str):
-    tokens = []
-    tokens.extend(RANGE_RE.findall(text))
-    for match in PRICE_RE.findall(text):
-        if match not in tokens:
-            tokens.append(match)
-    return tokens
+    return list(dict.fromkeys(match.group(0) for match in PRICE_COMBINED.finditer(text)))
 
 
 ALIASES = {
@@ -121,45 +189,85 @@ ALIASES = {
     "beats-pill": [r"\bbeats\b"],
 }
 
+# Leading literal of an alias pattern, e.g. "iphone 17 pro" for r"\biphone 17 pro\b".
+LEADING_LITERAL_RE = re.compile(r"\\b([a-z0-9 ]+)(?![?*+{])")
+
+
+def literal_hint(pattern: str) -> str:
+    if "|" in pattern:
+        return ""
+    match = LEADING_LITERAL_RE.match(pattern)
+    return match.group(1).strip() if match else ""
 
-def choose_row(item_id: str, product_name: str, rows):
-    candidates = ALIASES.get(item_id, [])
-    if candidates:
-        for pattern in candidates:
-            regex = re.compile(pattern)
-            for row in rows:
-                row_text = " ".join(row)
-                row_norm = normalize(row_text)
+
+COMPILED_ALIASES = {k: [re.compile(p) for p in v] for k, v in ALIASES.items()}
+LITERAL_HINTS = {k: [literal_hint(p) for p in v] for k, v in ALIASES.items()}
+MERGED_ALIASES = {k: re.compile("|".join(f"(?:{p})" for p in v)) for k, v in ALIASES.items()}
+# Everything choose_row needs for one item: merged regex, ordered regexes, literal hints.
+ROW_MATCHERS = {
+    sys.intern(k): (MERGED_ALIASES[k], COMPILED_ALIASES[k], LITERAL_HINTS[k])
+    for k in ALIASES
+}
+FLEXIBLE_ALIASES = {
+    k: [re.compile(p.replace(" ", r"\W+"), re.IGNORECASE) for p in v]
+    for k, v in ALIASES.items()
+}
+MERGED_FLEXIBLE_ALIASES = {
+    k: re.compile("|".join("(?:{})".format(p.replace(" ", r"\W+")) for p in v), re.IGNORECASE)
+    for k, v in ALIASES.items()
+}
+
+
+def choose_row(matcher, product_name: str, norm_rows, token_to_rows):
+    if matcher:
+        merged, (first, *rest), hints = matcher
+        hits = []
+        for _, row_text, row_norm, _ in norm_rows:
+            if not any(hint in row_norm for hint in hints):
+                continue
+            if not merged.search(row_norm):
+                continue
+            if not rest or first.search(row_norm):
+                return row_text
+            hits.append((row_text, row_norm))
+        # Only later aliases matched; they still apply in ALIASES order.
+        for regex in rest:
+            for row_text, row_norm in hits:
                 if regex.search(row_norm):
                     return row_text
         return None
 
     target = normalize(product_name)
     target_words = [w for w in target.split(" ") if w]
-    best = None
-    best_score = 0
-    for row in rows:
-        row_text = " ".join(row)
-        row_norm = normalize(row_text)
-        if not row_norm:
-            continue
-        score = sum(1 for w in target_words if w in row_norm)
-        if score > best_score:
-            best_score = score
-            best = row_text
-    if best_score >= max(2, len(target_words) // 2):
-        return best
+    scores = Counter()
+    for word in frozenset(target_words):
+        for i in token_to_rows.get(word, ()):
+            scores[i] += 1
+    if not scores:
+        return None
+    # Highest score wins; ties go to the earliest row.
+    best = min(scores, key=lambda i: (-scores[i], i))
+    if scores[best] >= max(2, len(target_words) // 2):
+        return norm_rows[best][1]
     return None
 
 
+@functools.lru_cache(maxsize=None)
+def flexible_name_regex(product_name: str):
+    return re.compile(re.escape(product_name).replace(" ", r"\W+"), re.IGNORECASE)
+
+
 def search_in_text(product_id: str, product_name: str, text_blocks: list[str]) -> Optional[str]:
-    patterns = ALIASES.get(product_id, [])
+    patterns = FLEXIBLE_ALIASES.get(product_id)
+    merged = MERGED_FLEXIBLE_ALIASES.get(product_id)
     if not patterns:
-        patterns = [re.escape(product_name)]
+        merged = flexible_name_regex(product_name)
+        patterns = [merged]
     for block in text_blocks:
-        for pattern in patterns:
-            flexible = pattern.replace(" ", r"\W+")
-            regex = re.compile(flexible, re.IGNORECASE)
+        # One scan tells whether any alias occurs in the block at all.
+        if not merged.search(block):
+            continue
+        for regex in patterns:
             match = regex.search(block)
             if not match:
                 continue
@@ -171,21 +279,59 @@ def search_in_text(product_id: str, product_name: str, text_blocks: list[str]) -
     return None
 
 
-def update_prices(catalog: dict, rows, text_blocks, category_ids):
+def update_prices(catalog: dict, rows, get_text_blocks, category_ids):
     matched = 0
     total = 0
     updates = []
+    # Rows are shared by every item, so normalize them once up front.
+    # Table headers and footers repeat on every page; reuse their work too.
+    norm_rows = []
+    seen = {}
+    for row in rows:
+        row_text = " ".join(row)
+        if row_text not in seen:
+            row_norm = normalize(row_text)
+            seen[row_text] = (row_norm, frozenset(row_norm.split()))
+        row_norm, row_tokens = seen[row_text]
+        norm_rows.append((row, row_text, row_norm, row_tokens))
+    token_to_rows = defaultdict(list)
+    for i, (_, _, _, row_tokens) in enumerate(norm_rows):
+        for token in row_tokens:
+            token_to_rows[token].append(i)
+
+    # Several items share an alias list (every Beats product, both Hermès
+    # watches), so a text search is only run once per distinct key.
+    # Text blocks are only materialized the first time a lookup needs them.
+    text_matches = {}
+    text_blocks = None
+
+    def find_in_text(item_id, product_name):
+        nonlocal text_blocks
+        key = tuple(ALIASES.get(item_id, ())) or product_name
+        if key not in text_matches:
+            if text_blocks is None:
+                text_blocks = get_text_blocks()
+            text_matches[key] = search_in_text(item_id, product_name, text_blocks)
+        return text_matches[key]
 
     for category in catalog.get("categories", []):
         if category["id"] not in category_ids:
             continue
-        for item in category.get("items", []):
+        items = category.get("items", [])
+        # Only this category's aliases are looked up, once per category.
+        category_matchers = {
+            item_id: ROW_MATCHERS[item_id]
+            for item_id in (sys.intern(item.get("id", "")) for item in items)
+            if item_id in ROW_MATCHERS
+        }
+        for item in items:
             total += 1
-            item_id = item.get("id", "")
-            row_text = choose_row(item_id, item.get("name", ""), rows)
+            item_id = sys.intern(item.get("id", ""))
+            matcher = category_matchers.get(item_id)
+            row_text = choose_row(matcher, item.get("name", ""), norm_rows, token_to_rows)
             used_text_search = False
-            if not row_text and text_blocks:
-                row_text = search_in_text(item_id, item.get("name", ""), text_blocks)
+            if not row_text:
+                row_text = find_in_text(item_id, item.get("name", ""))
                 used_text_search = True
             if not row_text:
                 updates.append({"id": item_id, "status": "no-match"})
@@ -196,8 +342,8 @@ def update_prices(catalog: dict, rows, text_blocks, category_ids):
             if applecare.get("standardMonthly") is not None:
                 expected = 2
 
-            if len(prices) < expected and not used_text_search and text_blocks:
-                fallback_text = search_in_text(item_id, item.get("name", ""), text_blocks)
+            if len(prices) < expected and not used_text_search:
+                fallback_text = find_in_text(item_id, item.get("name", ""))
                 if fallback_text:
                     row_text = fallback_text
                     prices = find_price_tokens(row_text)
@@ -229,14 +375,18 @@ def main():
     parser.add_argument("--config", required=True)
     parser.add_argument("--output", required=True)
     parser.add_argument("--force", action="store_true")
+    parser.add_argument("--text-backend", choices=["pdfplumber", "pymupdf"], default="pdfplumber")
     args = parser.parse_args()
 
     if pdfplumber is None:
         print("pdfplumber is not installed. Run: python3 -m pip install pdfplumber", file=sys.stderr)
         sys.exit(1)
 
-    with open(args.config, "r", encoding="utf-8") as f:
-        config = json.load(f)
+    if args.text_backend == "pymupdf" and fitz is None:
+        print("PyMuPDF is not installed. Run: python3 -m pip install pymupdf", file=sys.stderr)
+        sys.exit(1)
+
+    config = load_json(args.config)
 
     pdf_url = config.get("pdf_url")
     mac_pdf_url = config.get("mac_pdf_url")
@@ -244,36 +394,43 @@ def main():
         print("Missing pdf_url in import-config.json", file=sys.stderr)
         sys.exit(1)
 
-    with open(args.output, "r", encoding="utf-8") as f:
-        catalog = json.load(f)
+    catalog = load_json(args.output)
 
     tmp_dir = tempfile.mkdtemp(prefix="acplus-")
     pdf_path = os.path.join(tmp_dir, "main.pdf")
-
-    urllib.request.urlretrieve(pdf_url, pdf_path)
-    rows = extract_tables(pdf_path)
-    text_blocks = extract_text_blocks(pdf_path)
-    if not rows:
-        rows = extract_text_rows(pdf_path)
+    mac_pdf_path = os.path.join(tmp_dir, "mac.pdf")
+
+    downloads = ThreadPoolExecutor(max_workers=2)
+    main_download = downloads.submit(download, pdf_url, pdf_path)
+    mac_download = downloads.submit(download, mac_pdf_url, mac_pdf_path) if mac_pdf_url else None
+    downloads.shutdown(wait=False)
+
+    # pdfminer is CPU-bound, so each PDF is parsed in its own process as
+    # soon as it is on disk; the Mac download overlaps the main parse.
+    with ProcessPoolExecutor(max_workers=2) as parsers:
+        main_download.result()
+        main_parse = parsers.submit(parse_pdf, pdf_path, args.text_backend)
+        mac_parse = None
+        if mac_download:
+            mac_download.result()
+            mac_parse = parsers.submit(parse_pdf, mac_pdf_path, args.text_backend)
+        rows, text_blocks = main_parse.result()
+        mac_rows, mac_blocks = mac_parse.result() if mac_parse else ([], [])
+    get_text_blocks = lazy_text_blocks(pdf_path, text_blocks)
+    get_mac_blocks = lazy_text_blocks(mac_pdf_path, mac_blocks)
 
     matched_main, total_main, updates_main = update_prices(
         catalog,
         rows,
-        text_blocks,
+        get_text_blocks,
         category_ids={"iphone", "ipad", "watch", "airpods", "beats", "appletv", "homepod"}
     )
 
-    if mac_pdf_url:
-        mac_pdf_path = os.path.join(tmp_dir, "mac.pdf")
-        urllib.request.urlretrieve(mac_pdf_url, mac_pdf_path)
-        mac_rows = extract_tables(mac_pdf_path)
-        mac_blocks = extract_text_blocks(mac_pdf_path)
-        if not mac_rows:
-            mac_rows = extract_text_rows(mac_pdf_path)
+    if mac_parse:
         matched_mac, total_mac, updates_mac = update_prices(
             catalog,
             mac_rows,
-            mac_blocks,
+            get_mac_blocks,
             category_ids={"mac"}
         )
     else:
@@ -292,8 +449,7 @@ def main():
     }
 
     report_path = os.path.join(os.path.dirname(args.output), "import-report.json")
-    with open(report_path, "w", encoding="utf-8") as f:
-        json.dump(report, f, ensure_ascii=False, indent=4)
+    dump_json(report, report_path)
 
     if ratio < 1.0 and not args.force:
         print("Not all items matched ({} / {}). Report written to Data/import-report.json".format(matched, total), file=sys.stderr)
@@ -302,8 +458,7 @@ def main():
     catalog["lastUpdated"] = datetime.date.today().isoformat()
     catalog["sources"] = [pdf_url] + ([mac_pdf_url] if mac_pdf_url else [])
 
-    with open(args.output, "w", encoding="utf-8") as f:
-        json.dump(catalog, f, ensure_ascii=False, indent=4)
+    dump_json(catalog, args.output)
 
     print("Updated {} (matched {}/{})".format(args.output, matched, total))
 